@@ -1,31 +1,118 @@
+import atexit
 import os
+import queue
+import threading
 from PIL import Image
 import numpy as np
 import pyttsx3
 
+CHUNK_BITS = 1 << 19
+_DELIM = "###END###"
+
+_tts_engine = None
+_tts_error = None
+_tts_thread = None
+_tts_queue = queue.Queue()
+_tts_lock = threading.Lock()
+
+def _tts_say(text: str, spoken_log: str, failed_log: str, log):
+    try:
+        _tts_engine.say(text)
+        _tts_engine.runAndWait()
+        log(spoken_log)
+    except Exception as e:
+        log(f"{failed_log}: {str(e)}")
+
+def _tts_worker(ready: threading.Event):
+    global _tts_engine, _tts_error
+    try:
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 150)
+        _tts_engine = engine
+    except Exception as e:
+        _tts_error = e
+    finally:
+        ready.set()
+    if _tts_engine is None:
+        return
+    while True:
+        item = _tts_queue.get()
+        try:
+            if item is None:
+                return
+            _tts_say(*item)
+        finally:
+            item = None
+            _tts_queue.task_done()
+
+def _start_tts(log):
+    global _tts_thread
+    with _tts_lock:
+        if _tts_thread is None:
+            ready = threading.Event()
+            _tts_thread = threading.Thread(target=_tts_worker, args=(ready,), daemon=True)
+            _tts_thread.start()
+            ready.wait()
+            if _tts_engine is not None:
+                atexit.register(_stop_tts)
+                log("Text-to-speech engine initialized")
+            else:
+                log(f"Failed to initialize text-to-speech engine: {str(_tts_error)}")
+        return _tts_engine
+
+def _stop_tts():
+    global _tts_engine
+    with _tts_lock:
+        if _tts_thread is not None and _tts_thread.is_alive():
+            _tts_queue.put(None)
+            _tts_thread.join()
+        _tts_engine = None
+
 class RGBImageSteganography:
     def __init__(self, verbose: bool = True):
-        self.delimiter = "###END###"
+        self.delimiter = _DELIM
         self.verbose = verbose
-        try:
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty('rate', 150)
-            self._log("Text-to-speech engine initialized")
-        except Exception as e:
-            self._log(f"Failed to initialize text-to-speech engine: {str(e)}")
-            self.tts_engine = None
     
+    @property
+    def delimiter(self) -> str:
+        return self._delimiter
+
+    @delimiter.setter
+    def delimiter(self, value: str):
+        self._delimiter = value
+        self._delim_bytes = value.encode('latin-1')
+
+    @property
+    def tts_engine(self):
+        return _start_tts(self._log)
+
     def _log(self, message: str):
         if self.verbose:
             print(message)
     
+    def _speak(self, text: str, spoken_log: str, failed_log: str):
+        if self.tts_engine:
+            _tts_queue.put((text, spoken_log, failed_log, self._log))
+
+    def wait_for_speech(self):
+        if _tts_thread is not None and _tts_thread.is_alive():
+            _tts_queue.join()
+
+    def close(self):
+        _stop_tts()
+
+    def _check_path(self, image_path: str) -> bool:
+        if not os.path.isfile(image_path):
+            self._log(f"Image file '{image_path}' not found.")
+            return False
+        if not image_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+            self._log("Only PNG or JPEG images are supported.")
+            return False
+        return True
+
     def validate_image(self, image_path: str) -> bool:
         try:
-            if not os.path.isfile(image_path):
-                self._log(f"Image file '{image_path}' not found.")
-                return False
-            if not image_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                self._log("Only PNG or JPEG images are supported.")
+            if not self._check_path(image_path):
                 return False
             img = Image.open(image_path)
             img.verify()
@@ -36,25 +123,36 @@ class RGBImageSteganography:
             self._log(f"Error validating image: {str(e)}")
             return False
 
+    def _load_rgb(self, image_path: str):
+        if not self._check_path(image_path):
+            return None
+        try:
+            with Image.open(image_path) as img:
+                img.load()
+                pixels = np.array(img.convert("RGB"))
+        except Exception as e:
+            self._log(f"Error validating image: {str(e)}")
+            return None
+        self._log(f"Valid image: {image_path}")
+        return pixels
+
     def hide_text_in_image(self, image_path: str, text: str, output_path: str) -> bool:
         try:
-            if not self.validate_image(image_path):
+            pixels = self._load_rgb(image_path)
+            if pixels is None:
                 return False
-            img = Image.open(image_path).convert("RGB")
-            pixels = np.array(img)
             height, width, _ = pixels.shape
-            delimited_text = text + self.delimiter
-            binary_text = ''.join(format(ord(char), '08b') for char in delimited_text)
+            payload = text.encode('latin-1') + self._delim_bytes
+            n = len(payload) * 8
             max_bits = width * height * 3
-            if len(binary_text) > max_bits:
-                self._log(f"Message too long! Needs {len(binary_text)} bits, capacity {max_bits} bits")
+            if n > max_bits:
+                self._log(f"Message too long! Needs {n} bits, capacity {max_bits} bits")
                 return False
-            flat_pixels = pixels.ravel()
-            for i in range(len(binary_text)):
-                flat_pixels[i] = (flat_pixels[i] & 0xFE) | int(binary_text[i])
-            steg_img = Image.fromarray(pixels, "RGB")
-            steg_img.save(output_path)
-            self._log(f"Text hidden in '{output_path}' ({len(text)} chars, {len(binary_text)} bits)")
+            flat_pixels = pixels.reshape(-1)
+            flat_pixels[:n] &= 0xFE
+            flat_pixels[:n] |= np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+            Image.frombuffer("RGB", (width, height), flat_pixels, "raw", "RGB", 0, 1).save(output_path, compress_level=1)
+            self._log(f"Text hidden in '{output_path}' ({len(text)} chars, {n} bits)")
             return True
         except Exception as e:
             self._log(f"Error hiding text: {str(e)}")
@@ -62,40 +160,34 @@ class RGBImageSteganography:
 
     def extract_text_from_image(self, image_path: str) -> str:
         try:
-            if not self.validate_image(image_path):
+            pixels = self._load_rgb(image_path)
+            if pixels is None:
                 return f"Invalid image file '{image_path}'"
-            img = Image.open(image_path).convert("RGB")
-            pixels = np.array(img).ravel()
-            binary_data = ''.join(str(p & 1) for p in pixels)
-            message = ""
-            delimiter_bits = ''.join(format(ord(c), '08b') for c in self.delimiter)
-            for i in range(0, len(binary_data), 8):
-                byte = binary_data[i:i+8]
-                if i + len(delimiter_bits) <= len(binary_data) and binary_data[i:i+len(delimiter_bits)] == delimiter_bits:
+            pixels = pixels.reshape(-1)
+            data = bytearray()
+            end = -1
+            lsb = np.empty(min(CHUNK_BITS, pixels.size), dtype=np.uint8)
+            for start in range(0, pixels.size, CHUNK_BITS):
+                chunk = pixels[start:start + CHUNK_BITS]
+                bits = np.bitwise_and(chunk, 1, out=lsb[:chunk.size])
+                bits = bits[:bits.size - bits.size % 8]
+                search_from = max(len(data) - len(self._delim_bytes) + 1, 0)
+                data += np.packbits(bits).tobytes()
+                end = data.find(self._delim_bytes, search_from)
+                if end != -1:
                     break
-                char_code = int(byte, 2)
-                message += chr(char_code)
+            message = (data if end == -1 else data[:end]).decode('latin-1')
             if message:
                 self._log(f"Extracted: {message}")
                 if self.tts_engine:
-                    try:
-                        self.tts_engine.say(message)
-                        self.tts_engine.runAndWait()
-                        self._log("Message spoken aloud")
-                    except Exception as e:
-                        self._log(f"Failed to speak message: {str(e)}")
+                    self._speak(message, "Message spoken aloud", "Failed to speak message")
                 else:
                     self._log("Text-to-speech engine not available")
                 return message
             else:
                 self._log("No hidden message found.")
                 if self.tts_engine:
-                    try:
-                        self.tts_engine.say("No hidden message found")
-                        self.tts_engine.runAndWait()
-                        self._log("Default message spoken aloud")
-                    except Exception as e:
-                        self._log(f"Failed to speak default message: {str(e)}")
+                    self._speak("No hidden message found", "Default message spoken aloud", "Failed to speak default message")
                 return "No hidden message found."
         except Exception as e:
             return f"Error extracting text: {str(e)}"
@@ -147,6 +239,7 @@ def interactive_demo():
             image_path = input("Image path to extract (image.png or image.jpg): ").strip()
             if image_path:
                 steg.extract_text_from_image(image_path)
+                steg.wait_for_speech()
             else:
                 print("Missing image path.")
         elif choice == "4":
@@ -161,6 +254,7 @@ def interactive_demo():
             else:
                 print("Missing image path.")
         elif choice == "5":
+            steg.close()
             print("Goodbye!")
             break
         else: